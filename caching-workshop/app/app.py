@@ -1,42 +1,47 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, Response, render_template
 import time
+import orjson
 from utils.calculator import benchmark_fibonacci
+from utils.http_cache import compute_etag, is_not_modified
+from utils.redis_cache import REDIS_URL, redis_cache, redis_client, redis_memoize
 from models.database import init_db
-from models.products import get_products
+from models.products import get_products, get_products_redis, get_product_by_id, update_product, get_products_generation
 from datetime import datetime, timedelta
-from flask import make_response, request
-from redis import Redis
+from flask import make_response, request, flash, redirect, url_for
 from flask_caching import Cache
 
 # Initialize database on startup
 init_db()
 
 app = Flask(__name__)
-# Add to your Flask app configuration
-app.config['REDIS_URL'] = 'redis://localhost:6379/0'
-redis_client = Redis.from_url(app.config['REDIS_URL'])
+# Needed for flash messages on the edit product form
+app.config['SECRET_KEY'] = 'dev'
+# Set to True to add artificial delays to the demo views
+app.config['SIMULATE_SLOW'] = False
+# Set to True to add an artificial 0.5s delay to product lookups
+app.config['SIMULATE_SLOW_DB'] = False
 
 # Configure caching
 cache_config = {
     "CACHE_TYPE": "RedisCache",
-    "CACHE_REDIS_URL": "redis://localhost:6379/0",
+    "CACHE_REDIS_URL": REDIS_URL,
     "CACHE_DEFAULT_TIMEOUT": 300
 }
 cache = Cache(app, config=cache_config)
 
-# Make redis_client available to other modules
-app.extensions['redis'] = redis_client
-
 @app.route('/')
 def index():
     # Simulate a slow operation
-    time.sleep(2)
+    if app.config['SIMULATE_SLOW']:
+        time.sleep(2)
     return render_template('index.html')
 
 @app.route('/api/data')
+@redis_cache('api_data', ttl=30)
 def get_data():
     # Simulate expensive data retrieval
-    time.sleep(1)
+    if app.config['SIMULATE_SLOW']:
+        time.sleep(1)
     data = {
         'items': [
             {'id': 1, 'name': 'Item 1'},
@@ -45,7 +50,7 @@ def get_data():
         ],
         'timestamp': time.time()
     }
-    return jsonify(data)
+    return data
 
 @app.route('/benchmark')
 def benchmark():
@@ -54,17 +59,33 @@ def benchmark():
 
 @app.route('/products')
 def product_list():
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    last_id = int(request.args.get('after', 0))
+    # A page needs at least one row; SQLite treats a negative LIMIT as no limit
+    per_page = max(int(request.args.get('per_page', 10)), 1)
     use_cache = request.args.get('cache', 'true').lower() != 'false'
     
-    result = get_products(page, per_page, use_cache)
+    # Derive the ETag from the request and the product list generation, which
+    # also keys the cached page, so a match is answered without running the
+    # page query at all. It's weak because the rendered query time differs
+    # between otherwise equal pages.
+    generation = get_products_generation()
+    version = (last_id, per_page, use_cache, generation)
+    etag = compute_etag(repr(version).encode(), weak=True)
+    if is_not_modified(etag):
+        return '', 304, {'ETag': etag}
+    
+    result = get_products(last_id, per_page, use_cache, generation)
     
-    return render_template('products.html', 
+    response = make_response(render_template('products.html', 
             products=result['products'], 
             pagination=result['pagination'],
             query_time=result['query_time'],
-            use_cache=use_cache)
+            use_cache=use_cache,
+            time=time))
+    response.headers['ETag'] = etag
+    # Serve a stale copy instantly for up to a minute while revalidating
+    response.headers['Cache-Control'] = 'public, max-age=30, stale-while-revalidate=60'
+    return response
 
 @app.route('/products/<int:product_id>')
 def product_detail(product_id):
@@ -123,13 +144,14 @@ def conditional_content():
     # Generate content
     content = "<h1>Conditional Content</h1><p>This content uses ETags for efficient caching.</p>"
     
-    # Generate an ETag (in a real app, this would be based on the content)
-    etag = f"v1-{hash(content)}"
+    # Generate a weak ETag from a content hash; unlike hash(), blake2b gives the
+    # same value in every worker and across restarts
+    etag = compute_etag(content.encode(), weak=True)
     
     # Check if the client sent an If-None-Match header matching our ETag
-    if request.headers.get('If-None-Match') == etag:
+    if is_not_modified(etag):
         # The client already has the current version
-        return '', 304  # 304 Not Modified
+        return '', 304, {'ETag': etag, 'Vary': 'Accept-Encoding'}  # 304 Not Modified
     
     # Create response
     response = make_response(render_template('conditional_content.html', content=content))
@@ -137,33 +159,30 @@ def conditional_content():
     # Set ETag and Cache-Control headers
     response.headers['ETag'] = etag
     response.headers['Cache-Control'] = 'public, max-age=300'  # Cache for 5 minutes
+    # Keep compressed and uncompressed variants apart in shared caches
+    response.headers['Vary'] = 'Accept-Encoding'
     
     return response
 
 @app.route('/products/compare')
 def compare_caching():
-    page = int(request.args.get('page', 1))
+    last_id = int(request.args.get('after', 0))
     
     # Time Redis caching
     start = time.time()
-    redis_result = get_products_redis(page)
+    redis_result = get_products_redis(last_id)
     redis_time = time.time() - start
     
-    # Time simple in-memory caching
-    start = time.time()
-    memory_result = get_products(page, per_page=10, use_cache=True)
-    memory_time = time.time() - start
-    
     # Time uncached
     start = time.time()
-    uncached_result = get_products(page, per_page=10, use_cache=False)
+    uncached_result = get_products(last_id, per_page=10, use_cache=False)
     uncached_time = time.time() - start
     
     return render_template('compare_caching.html',
         redis_time=redis_time,
-        memory_time=memory_time,
         uncached_time=uncached_time,
-        page=page)
+        after=last_id,
+        next_cursor=uncached_result['pagination']['next_cursor'])
 
 @app.route('/products/<int:product_id>/edit', methods=['GET', 'POST'])
 def edit_product(product_id):
@@ -184,27 +203,48 @@ def edit_product(product_id):
 @app.route('/expensive-view')
 @cache.cached(timeout=60)
 def expensive_view():
-    time.sleep(3)  # Simulate expensive operation
+    if app.config['SIMULATE_SLOW']:
+        time.sleep(3)  # Simulate expensive operation
     return "This view took a long time to generate at: " + str(time.time())
 
-@cache.memoize(timeout=60)
+@redis_memoize('expensive_function', ttl=60)
 def expensive_function(param1, param2):
-    time.sleep(2)
+    if app.config['SIMULATE_SLOW']:
+        time.sleep(2)
     return f"Result for {param1} and {param2} at {time.time()}"
 
-@app.route('/api/weather')
-@cache.cached(timeout=60, query_string=True)
-def weather_api():
+@cache.memoize(timeout=60)
+def fetch_weather(bucket, source):
+    """Fetch the weather once per 60 second bucket, as serialized JSON"""
     # Simulate API call to external weather service
-    time.sleep(1)
+    if app.config['SIMULATE_SLOW']:
+        time.sleep(1)
     
     # In a real app, this would call an actual weather API
-    return jsonify({
+    data = {
         "temperature": 72 + (time.time() % 10) - 5,  # Random-ish value
         "conditions": ["sunny", "cloudy", "rainy"][int(time.time() % 3)],
         "timestamp": time.time(),
-        "source": "cache" if request.args.get('cached') else "live"
-    })
+        "source": source
+    }
+    return orjson.dumps(data)
+
+@app.route('/api/weather')
+def weather_api():
+    source = "cache" if request.args.get('cached') else "live"
+    
+    # The server cache, the ETag and max-age all follow the same 60 second
+    # bucket, so browsers and CDNs expire their copy when the server does
+    now = int(time.time())
+    bucket = now // 60
+    etag = f'W/"{source}-{bucket}"'
+    if is_not_modified(etag):
+        return '', 304, {'ETag': etag}
+    
+    response = Response(fetch_weather(bucket, source), mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = f'public, max-age={60 - now % 60}'
+    return response
 
 @app.route('/weather')
 def weather_demo():
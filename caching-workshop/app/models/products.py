@@ -1,93 +1,113 @@
 import time
+import orjson
+from flask import current_app
 from models.database import get_db_connection
-from utils.redis_cache import redis_cache
-
-# Simple in-memory cache
-_cache = {}
-
-def get_products(page=1, per_page=10, use_cache=True):
-    """Get a paginated list of products, with optional caching"""
-    cache_key = f'products_page_{page}_per_page_{per_page}'
-    
-    # Check cache first if caching is enabled
-    if use_cache and cache_key in _cache:
-        cache_entry = _cache[cache_key]
-        # Check if cache is still valid (30 seconds TTL)
-        if time.time() - cache_entry['timestamp'] < 30:
-            print("Cache hit!")
-            return cache_entry['data']
-        else:
-            print("Cache expired!")
-    else:
-        print("Cache miss!")
+from utils.redis_cache import redis_cache_dict, redis_client
+from utils.tasks import invalidate_product_lists
+
+# Redis key holding the current product list generation
+PRODUCTS_GENERATION_KEY = 'products_generation'
+
+# Seek past the cursor instead of scanning and discarding OFFSET rows. Kept as
+# one constant string so SQLite's per-connection statement cache reuses the
+# compiled statement, which idx_products_id_cov answers without touching the table.
+PRODUCTS_PAGE_QUERY = '''
+    SELECT id, name, price 
+    FROM products 
+    WHERE id > ?
+    ORDER BY id 
+    LIMIT ?
+'''
+
+def _get_total_count(conn):
+    """Get the total product count, cached in Redis separately from the pages"""
+    total = redis_client.get('products_total')
+    if total is not None:
+        return int(total)
     
-    # Cache miss or expired, query the database
+    # The count only changes when products are added or removed (1 hour TTL)
+    total = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+    redis_client.setex('products_total', 3600, total)
+    return total
+
+def _query_products(last_id, per_page):
+    """Query a page of products after the `last_id` cursor"""
     start_time = time.time()
     
     with get_db_connection() as conn:
-        offset = (page - 1) * per_page
-        query = '''
-            SELECT id, name, price 
-            FROM products 
-            ORDER BY id 
-            LIMIT ? OFFSET ?
-        '''
-        rows = conn.execute(query, (per_page, offset)).fetchall()
+        # Fetch one extra row to learn whether another page follows
+        rows = conn.execute(PRODUCTS_PAGE_QUERY, (last_id, per_page + 1)).fetchall()
+        has_next = len(rows) > per_page
         
         # Convert to list of dictionaries
-        products = [dict(row) for row in rows]
+        products = [dict(row) for row in rows[:per_page]]
         
         # Get total count for pagination
-        total = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+        total = _get_total_count(conn)
     
     query_time = time.time() - start_time
     
-    result = {
+    return {
         'products': products,
         'pagination': {
-            'page': page,
+            'after': last_id,
             'per_page': per_page,
             'total': total,
-            'pages': (total + per_page - 1) // per_page
+            'next_cursor': products[-1]['id'] if has_next else None
         },
         'query_time': query_time
     }
-    
-    # Update cache
+
+def get_products(last_id=0, per_page=10, use_cache=True, generation=None):
+    """Get a page of products after the `last_id` cursor, with optional caching"""
     if use_cache:
-        _cache[cache_key] = {
-            'data': result,
-            'timestamp': time.time()
-        }
-    
-    return result
+        return get_products_redis(last_id, per_page, generation)
+    return _query_products(last_id, per_page)
 
-def get_product_by_id(product_id, use_cache=True):
-    """Get a product by ID with caching"""
-    cache_key = f'product_{product_id}'
-    
-    # Check cache first if caching is enabled
-    if use_cache and cache_key in _cache:
-        cache_entry = _cache[cache_key]
-        # Check if cache is still valid (1 minute TTL)
-        if time.time() - cache_entry['timestamp'] < 60:
-            print(f"Cache hit for product {product_id}!")
-            return cache_entry['data']
-        else:
-            print(f"Cache expired for product {product_id}!")
-    else:
-        print(f"Cache miss for product {product_id}!")
+# Fields cached per product in the product:{id} hash
+PRODUCT_FIELDS = ('id', 'name', 'price', 'description', 'created_at')
+# Fields that may be NULL, cached by leaving them out of the hash
+NULLABLE_PRODUCT_FIELDS = ('description',)
+
+def _cache_product(pipeline, product):
+    """Queue replacing a product's Redis hash (1 minute TTL)"""
+    key = f"product:{product['id']}"
+    pipeline.delete(key)
+    pipeline.hset(key, mapping={
+        field: product[field]
+        for field in PRODUCT_FIELDS
+        if product[field] is not None
+    })
+    pipeline.expire(key, 60)
+
+def _load_cached_product(fields):
+    """Rebuild a product from its Redis hash, or None if missing or partial"""
+    for field in PRODUCT_FIELDS:
+        if field not in NULLABLE_PRODUCT_FIELDS and field.encode() not in fields:
+            return None
     
-    # Cache miss or expired, query the database
+    product = {
+        field: fields[field.encode()].decode() if field.encode() in fields else None
+        for field in PRODUCT_FIELDS
+    }
+    product['id'] = int(product['id'])
+    product['price'] = float(product['price'])
+    return product
+
+def _query_product(product_id):
+    """Query a single product by ID"""
     start_time = time.time()
     
     with get_db_connection() as conn:
-        # Simulate a complex query with SLEEP
+        # Primary key lookup of only the fields the detail and edit pages use
         query = '''
-            SELECT * FROM products WHERE id = ?
+            SELECT id, name, price, description, created_at
+            FROM products
+            WHERE id = ?
         '''
-        # Simulate a complex join or slow query
-        time.sleep(0.5)  
+        # Optionally simulate a complex join or slow query for demos
+        if current_app.config.get('SIMULATE_SLOW_DB'):
+            time.sleep(0.5)
         product = conn.execute(query, (product_id,)).fetchone()
         
         if product is None:
@@ -97,134 +117,179 @@ def get_product_by_id(product_id, use_cache=True):
     
     query_time = time.time() - start_time
     
-    result = {
+    return {
         'product': product,
         'query_time': query_time
     }
+
+def get_product_by_id(product_id, use_cache=True):
+    """Get a product by ID with optional caching in a Redis hash"""
+    if not use_cache:
+        return _query_product(product_id)
     
-    # Update cache
-    if use_cache:
-        _cache[cache_key] = {
-            'data': result,
-            'timestamp': time.time()
+    start_time = time.time()
+    product = _load_cached_product(redis_client.hgetall(f"product:{product_id}"))
+    if product is not None:
+        return {
+            'product': product,
+            'query_time': time.time() - start_time
         }
     
+    # Cache miss, query the database and cache the result
+    result = _query_product(product_id)
+    if result is not None:
+        pipeline = redis_client.pipeline()
+        _cache_product(pipeline, result['product'])
+        pipeline.execute()
+    
     return result
 
-@redis_cache('products_list', ttl=30)
-def get_products_redis(page=1, per_page=10):
-    """Get paginated products with Redis caching"""
-    with get_db_connection() as conn:
-        offset = (page - 1) * per_page
-        query = '''
-            SELECT id, name, price 
-            FROM products 
-            ORDER BY id 
-            LIMIT ? OFFSET ?
-        '''
-        rows = conn.execute(query, (per_page, offset)).fetchall()
-        products = [dict(row) for row in rows]
-        total = conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
-    
-    return {
-        'products': products,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': total,
-            'pages': (total + per_page - 1) // per_page
-        }
-    }
+def get_products_generation():
+    """
+    Get the current generation of the product lists, which changes whenever a
+    product is updated
+    """
+    generation = redis_client.get(PRODUCTS_GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so a flushed Redis never reuses an old generation
+        redis_client.set(PRODUCTS_GENERATION_KEY, time.time_ns(), nx=True)
+        generation = redis_client.get(PRODUCTS_GENERATION_KEY)
+    return int(generation)
+
+def get_products_redis(last_id=0, per_page=10, generation=None):
+    """Get a page of products after the `last_id` cursor with Redis caching"""
+    if generation is None:
+        generation = get_products_generation()
+    return _get_products_page(last_id, per_page, generation)
+
+@redis_cache_dict('products_list', ttl=30)
+def _get_products_page(last_id, per_page, generation):
+    """Cache a page per list generation, so an update is visible immediately"""
+    return _query_products(last_id, per_page)
 
 def get_with_stampede_protection(key, ttl, fallback_function, lock_timeout=5):
     """
     Get data with protection against cache stampede (dog-piling effect)
     """
-    # Try to get cached data
-    cached_data = cache.get(key)
-    if cached_data is not None:
-        return json.loads(cached_data)
-    
-    # Try to acquire lock
     lock_key = f"{key}:lock"
-    if cache.setnx(lock_key, "locked"):
-        # Set lock expiration
-        cache.expire(lock_key, lock_timeout)
+    ready_channel = f"{key}:ready"
+    
+    while True:
+        # Try to get cached data
+        cached_data = redis_client.get(key)
+        if cached_data is not None:
+            return orjson.loads(cached_data)
         
+        # Try to acquire lock (it expires on its own if the holder dies)
+        if redis_client.set(lock_key, "locked", nx=True, ex=lock_timeout):
+            try:
+                # Generate fresh data
+                fresh_data = fallback_function()
+                redis_client.setex(key, ttl, orjson.dumps(fresh_data))
+                return fresh_data
+            finally:
+                # Release lock and wake up everyone waiting for this key
+                redis_client.delete(lock_key)
+                redis_client.publish(ready_channel, "1")
+        
+        # Block until the lock holder publishes instead of polling
+        pubsub = redis_client.pubsub()
+        pubsub.subscribe(ready_channel)
         try:
-            # Generate fresh data
-            fresh_data = fallback_function()
-            cache.setex(key, ttl, json.dumps(fresh_data))
-            return fresh_data
+            # The lock may have been released before we subscribed
+            if redis_client.exists(lock_key):
+                deadline = time.monotonic() + lock_timeout
+                while time.monotonic() < deadline:
+                    message = pubsub.get_message(timeout=deadline - time.monotonic())
+                    if message and message['type'] == 'message':
+                        break
         finally:
-            # Release lock
-            cache.delete(lock_key)
-    else:
-        # Wait for lock to release
-        time.sleep(0.1)
-        return get_with_stampede_protection(key, ttl, fallback_function, lock_timeout)
+            pubsub.close()
 
 def get_multiple_products(product_ids):
-    """Get multiple products efficiently using Redis pipeline"""
-    pipeline = cache.pipeline()
-    
-    # Queue up all the GET commands
+    """Get multiple products with one roundtrip and one query for the cache misses"""
+    # Fetch every cached product hash in one network roundtrip
+    pipeline = redis_client.pipeline()
     for product_id in product_ids:
-        pipeline.get(f"product_{product_id}")
-    
-    # Execute all commands in one network roundtrip
+        pipeline.hgetall(f"product:{product_id}")
     cached_results = pipeline.execute()
     
-    results = []
-    for product_id, cached_data in zip(product_ids, cached_results):
-        if cached_data is not None:
-            results.append(json.loads(cached_data))
+    products = {}
+    missing = []
+    for product_id, fields in zip(product_ids, cached_results):
+        product = _load_cached_product(fields)
+        if product is None:
+            missing.append(product_id)
         else:
-            # Fallback to database for cache misses
-            product = get_product_from_db(product_id)
-            if product:
-                # Cache for future requests
-                cache.setex(f"product_{product_id}", 60, json.dumps(product)))
-                results.append(product)
+            products[product_id] = product
+    
+    if missing:
+        # Fallback to database for all cache misses in a single query
+        placeholders = ', '.join('?' * len(missing))
+        with get_db_connection() as conn:
+            rows = conn.execute(f'''
+                SELECT id, name, price, description, created_at
+                FROM products
+                WHERE id IN ({placeholders})
+            ''', missing).fetchall()
+        
+        # Cache for future requests
+        pipeline = redis_client.pipeline()
+        for row in rows:
+            product = dict(row)
+            products[product['id']] = product
+            _cache_product(pipeline, product)
+        pipeline.execute()
     
-    return results
+    return [products[product_id] for product_id in product_ids if product_id in products]
 
 def update_product(product_id, name=None, price=None, description=None):
-    """Update product and invalidate cache"""
+    """Update product, write it through to the cache and queue list invalidation"""
     with get_db_connection() as conn:
         # Update database
         updates = []
         params = []
+        changes = {}
         
         if name is not None:
             updates.append("name = ?")
             params.append(name)
+            changes['name'] = name
         if price is not None:
             updates.append("price = ?")
             params.append(price)
+            changes['price'] = price
         if description is not None:
             updates.append("description = ?")
             params.append(description)
+            changes['description'] = description
         
         if not updates:
             return False
         
         query = f"UPDATE products SET {', '.join(updates)} WHERE id = ?"
         params.append(product_id)
+        # Pooled connections autocommit, so the single UPDATE is applied here
         conn.execute(query, params)
-        conn.commit()
     
-    # Invalidate cache
-    redis_client = current_app.extensions['redis']
+    # Write the changed fields through to the cached product instead of
+    # invalidating it (a product that isn't cached is filled on its next read)
+    product_key = f"product:{product_id}"
+    if redis_client.exists(product_key):
+        # If the hash expires right after the check, HSET recreates it with
+        # only the changed fields; the same MULTI gives that partial hash a
+        # TTL, and readers treat it as a miss until then. The other fields
+        # still match the database, so a full TTL is safe either way
+        pipeline = redis_client.pipeline(transaction=True)
+        pipeline.hset(product_key, mapping=changes)
+        pipeline.expire(product_key, 60)
+        pipeline.execute()
     
-    # Delete specific product cache
-    redis_client.delete(f"product_{product_id}")
+    # Move the product lists to a new generation right away, so cached pages
+    # and ETags from before the update stop being served
+    redis_client.set(PRODUCTS_GENERATION_KEY, time.time_ns())
     
-    # Delete all product list caches (using a pattern)
-    keys = redis_client.keys("products_list:*")
-    if keys:
-        redis_client.delete(*keys)
+    # Clean up old list caches in the background so the write returns right away
+    invalidate_product_lists.delay()
     
     return True
-
-
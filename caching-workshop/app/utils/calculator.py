@@ -2,17 +2,16 @@ import time
 from functools import lru_cache
 
 def fibonacci_uncached(n):
-    """Calculate the nth Fibonacci number (inefficient recursive implementation)"""
-    if n <= 1:
-        return n
-    return fibonacci_uncached(n-1) + fibonacci_uncached(n-2)
+    """Calculate the nth Fibonacci number (iterative implementation)"""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
 
 @lru_cache(maxsize=128)
 def fibonacci_cached(n):
     """Calculate the nth Fibonacci number with caching"""
-    if n <= 1:
-        return n
-    return fibonacci_cached(n-1) + fibonacci_cached(n-2)
+    return fibonacci_uncached(n)
 
 def benchmark_fibonacci():
     """Compare the performance of cached vs uncached implementations"""
@@ -0,0 +1,23 @@
+import hashlib
+from flask import request
+from werkzeug.http import unquote_etag
+
+def compute_etag(payload, weak=False):
+    """
+    Compute a deterministic ETag for a response payload
+    
+    Args:
+        payload: Bytes the ETag should identify
+        weak: Mark the ETag as weak (semantically, not byte-for-byte, equal)
+    """
+    etag = '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+    return 'W/' + etag if weak else etag
+
+def is_not_modified(etag):
+    """
+    Check if the client's If-None-Match header matches the current ETag
+    
+    Uses the weak comparison If-None-Match calls for, so lists of ETags, "*"
+    and ETags weakened by a proxy all match.
+    """
+    return request.if_none_match.contains_weak(unquote_etag(etag)[0])
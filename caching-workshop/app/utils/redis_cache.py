@@ -1,34 +1,167 @@
-import json
+import gzip
+import hashlib
+import inspect
+import os
 import time
 from functools import wraps
-from flask import current_app
+import orjson
+from flask import Response, request
+from redis import Redis
+from utils.http_cache import compute_etag, is_not_modified
+
+# Set REDIS_URL in the environment to point the app and workers elsewhere
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+# Shared client, created once so cache lookups skip the Flask app proxy
+redis_client = Redis.from_url(REDIS_URL)
+
+def _make_cache_key(key_prefix, signature, args, kwargs):
+    """Generate a cache key, e.g. "products_list:0:10" for any call style"""
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return ":".join([key_prefix, *map(str, bound.arguments.values())])
+
+def _store(redis_client, key_prefix, cache_key, ttl, payload):
+    """
+    Store a payload in Redis and record the key under the prefix's tag set so
+    the whole group can be invalidated without scanning the keyspace
+    """
+    tag_key = f"tag:{key_prefix}"
+    pipeline = redis_client.pipeline()
+    pipeline.setex(cache_key, ttl, payload)
+    pipeline.sadd(tag_key, cache_key)
+    pipeline.expire(tag_key, ttl)
+    pipeline.execute()
 
 def redis_cache(key_prefix, ttl=60):
+    """
+    Decorator to cache a Flask view's JSON response in Redis
+    
+    The view returns a JSON-serializable object; it is serialized and gzipped
+    once per cache fill and the compressed bytes are sent as-is on every hit
+    (decompressed only for clients that don't accept gzip), with a public
+    max-age matching the entry's remaining TTL and an ETag so clients can
+    revalidate with If-None-Match.
+    
+    Args:
+        key_prefix: Prefix for cache keys, also names the "tag:<prefix>" set
+            holding every cached key for invalidation
+        ttl: Time-to-live in seconds
+    """
+    def decorator(f):
+        signature = inspect.signature(f)
+        
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            cache_key = _make_cache_key(key_prefix, signature, args, kwargs)
+            
+            # Try to get cached data and its remaining TTL in one roundtrip
+            pipeline = redis_client.pipeline()
+            pipeline.get(cache_key)
+            pipeline.ttl(cache_key)
+            payload, remaining = pipeline.execute()
+            
+            if payload is None:
+                # Cache miss - call original function, serialize and compress once
+                payload = gzip.compress(orjson.dumps(f(*args, **kwargs)), compresslevel=6, mtime=0)
+                _store(redis_client, key_prefix, cache_key, ttl, payload)
+                remaining = ttl
+            
+            use_gzip = request.accept_encodings['gzip'] > 0
+            body = payload if use_gzip else gzip.decompress(payload)
+            
+            # Each encoding gets its own ETag since the bytes differ
+            etag = compute_etag(body)
+            if is_not_modified(etag):
+                return '', 304, {'ETag': etag, 'Vary': 'Accept-Encoding'}
+            
+            response = Response(body, mimetype='application/json')
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+            response.headers['ETag'] = etag
+            # Browsers and CDNs may reuse the body as long as Redis keeps it
+            response.headers['Cache-Control'] = f'public, max-age={max(remaining, 0)}'
+            return response
+        return wrapper
+    return decorator
+
+def redis_cache_dict(key_prefix, ttl=60):
     """
     Decorator to cache function results in Redis
     
     Args:
-        key_prefix: Prefix for cache keys
+        key_prefix: Prefix for cache keys, also names the "tag:<prefix>" set
+            holding every cached key for invalidation
         ttl: Time-to-live in seconds
     """
     def decorator(f):
+        signature = inspect.signature(f)
+        
         @wraps(f)
         def wrapper(*args, **kwargs):
-            # Generate cache key
-            cache_key = f"{key_prefix}:{str(args)}:{str(kwargs)}"
+            cache_key = _make_cache_key(key_prefix, signature, args, kwargs)
             
             # Try to get cached data
-            redis_client = current_app.extensions['redis']
             cached_data = redis_client.get(cache_key)
             
             if cached_data is not None:
-                return json.loads(cached_data)
+                return orjson.loads(cached_data)
+            
+            # Cache miss - call original function
+            result = f(*args, **kwargs)
+            
+            _store(redis_client, key_prefix, cache_key, ttl, orjson.dumps(result))
+            
+            return result
+        return wrapper
+    return decorator
+
+def redis_memoize(key_prefix, ttl=60):
+    """
+    Decorator to memoize function results in Redis, keyed by a short hash of
+    the arguments
+    
+    Every access records the key in the "<prefix>:lru" sorted set, scored by
+    time, so the trim_lru task can evict the least recently used entries.
+    
+    Args:
+        key_prefix: Prefix for cache keys and the LRU sorted set
+        ttl: Time-to-live in seconds
+    """
+    lru_key = f"{key_prefix}:lru"
+    
+    def decorator(f):
+        signature = inspect.signature(f)
+        
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # Hash the arguments bound to the signature, so every call style
+            # maps to one key; dict keys are sorted so equal dicts match, and
+            # values orjson can't encode fall back to repr
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = orjson.dumps(
+                list(bound.arguments.items()),
+                default=repr,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            )
+            digest = hashlib.blake2b(arguments, digest_size=12).hexdigest()
+            cache_key = f"{key_prefix}:{digest}"
+            
+            # Read the value and bump its last access in one roundtrip
+            pipeline = redis_client.pipeline()
+            pipeline.get(cache_key)
+            pipeline.zadd(lru_key, {cache_key: time.time()})
+            cached_data, _ = pipeline.execute()
+            
+            if cached_data is not None:
+                return orjson.loads(cached_data)
             
             # Cache miss - call original function
             result = f(*args, **kwargs)
             
-            # Store in Redis
-            redis_client.setex(cache_key, ttl, json.dumps(result))
+            redis_client.setex(cache_key, ttl, orjson.dumps(result))
             
             return result
         return wrapper
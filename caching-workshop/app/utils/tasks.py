@@ -0,0 +1,42 @@
+from celery import Celery
+from utils.redis_cache import REDIS_URL, redis_client
+
+# Run a worker from the app directory with: celery -A utils.tasks worker --beat
+celery = Celery(__name__, broker=REDIS_URL)
+
+# Keep the memoized expensive_function results bounded
+celery.conf.beat_schedule = {
+    'trim-expensive-function-cache': {
+        'task': 'utils.tasks.trim_lru',
+        'schedule': 60.0,
+        'args': ('expensive_function', 10000),
+    },
+}
+
+@celery.task
+def invalidate_product_lists():
+    """Invalidate the cached product lists and total count after a product changes"""
+    pipeline = redis_client.pipeline()
+    
+    # Delete the cached total count
+    pipeline.delete('products_total')
+    
+    # Delete all product list caches recorded in their tag set
+    keys = redis_client.smembers('tag:products_list')
+    if keys:
+        pipeline.delete(*keys)
+    pipeline.delete('tag:products_list')
+    
+    pipeline.execute()
+
+@celery.task
+def trim_lru(key_prefix, max_entries=10000):
+    """Evict all but the `max_entries` most recently used redis_memoize results"""
+    lru_key = f"{key_prefix}:lru"
+    
+    excess = redis_client.zcard(lru_key) - max_entries
+    if excess > 0:
+        # Pop the oldest entries atomically, so a key accessed meanwhile keeps
+        # its newer score and isn't evicted
+        evicted = redis_client.zpopmin(lru_key, excess)
+        redis_client.delete(*[key for key, _ in evicted])
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+import redis
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app')
+sys.path.insert(0, APP_DIR)
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The Flask app backed by a fresh SQLite database and an in-memory Redis"""
+    server = fakeredis.FakeServer()
+    
+    with pytest.MonkeyPatch.context() as mp:
+        # app.py creates app.db in the working directory on import
+        mp.chdir(tmp_path_factory.mktemp('db'))
+        mp.setattr(redis.Redis, 'from_url', classmethod(lambda cls, url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)))
+        mp.setattr(redis, 'from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+        
+        from utils.tasks import celery
+        mp.setattr(celery.conf, 'task_always_eager', True)
+        
+        from app import app
+        yield app
+
+@pytest.fixture
+def client(app):
+    from utils.redis_cache import redis_client
+    redis_client.flushall()
+    return app.test_client()
@@ -0,0 +1,7 @@
+def test_conditional_content_not_modified_keeps_validators(client):
+    etag = client.get('/conditional-content').headers['ETag']
+    
+    response = client.get('/conditional-content', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.headers['Vary'] == 'Accept-Encoding'
@@ -0,0 +1,24 @@
+import threading
+
+def test_connections_are_reused_across_threads(app):
+    from models.database import get_db_connection
+    
+    with get_db_connection() as conn:
+        pass
+    
+    borrowed = []
+    def borrow():
+        with get_db_connection() as conn:
+            borrowed.append(conn)
+    
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join()
+    
+    assert borrowed == [conn]
+
+def test_concurrent_borrowers_get_separate_connections(app):
+    from models.database import get_db_connection
+    
+    with get_db_connection() as first, get_db_connection() as second:
+        assert first is not second
@@ -0,0 +1,86 @@
+def test_product_list_etag_changes_after_edit(client, monkeypatch):
+    # The Celery worker hasn't cleared the list caches yet
+    from utils.tasks import invalidate_product_lists
+    monkeypatch.setattr(invalidate_product_lists, 'delay', lambda *args: None)
+    
+    first = client.get('/products')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    
+    assert client.get('/products', headers={'If-None-Match': etag}).status_code == 304
+    
+    client.post('/products/1/edit', data={'name': 'RENAMED', 'price': '1.00', 'description': ''})
+    
+    # The old ETag must not match once the list has changed
+    edited = client.get('/products', headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert b'RENAMED' in edited.data
+    assert edited.headers['ETag'] != etag
+    
+    assert client.get('/products', headers={'If-None-Match': edited.headers['ETag']}).status_code == 304
+
+def test_product_list_etag_not_reused_after_redis_flush(client):
+    from utils.redis_cache import redis_client
+    
+    etag = client.get('/products').headers['ETag']
+    redis_client.flushall()
+    
+    assert client.get('/products', headers={'If-None-Match': etag}).status_code == 200
+
+def test_cached_product_keeps_null_description(app):
+    from models.database import get_db_connection
+    from models.products import get_product_by_id
+    from utils.redis_cache import redis_client
+    
+    redis_client.flushall()
+    with get_db_connection() as conn:
+        conn.execute('UPDATE products SET description = NULL WHERE id = 2')
+    
+    with app.app_context():
+        miss = get_product_by_id(2)['product']
+        hit = get_product_by_id(2)['product']
+    
+    assert miss['description'] is None
+    assert hit == miss
+
+def test_update_product_never_leaves_hash_without_ttl(app, monkeypatch):
+    from utils.redis_cache import redis_client
+    from models.products import update_product
+    
+    redis_client.flushall()
+    
+    # The cached hash expires between the EXISTS check and the write
+    monkeypatch.setattr(redis_client, 'exists', lambda key: True)
+    with app.app_context():
+        update_product(3, price=5.0)
+    
+    assert redis_client.hgetall('product:3') == {b'price': b'5.0'}
+    assert 0 < redis_client.ttl('product:3') <= 60
+
+def test_update_product_refreshes_cached_hash_ttl(app):
+    from utils.redis_cache import redis_client
+    from models.products import get_product_by_id, update_product
+    
+    redis_client.flushall()
+    with app.app_context():
+        get_product_by_id(4)
+        redis_client.expire('product:4', 5)
+        update_product(4, price=7.0)
+        cached = get_product_by_id(4)
+    
+    assert cached['product']['price'] == 7.0
+    assert redis_client.ttl('product:4') == 60
+
+def test_last_full_page_has_no_next_link(client):
+    last_page = client.get('/products?after=990&per_page=10')
+    assert b'Product 1000' in last_page.data
+    assert b'after=1000' not in last_page.data
+    
+    assert b'after=990' in client.get('/products?after=980&per_page=10').data
+
+def test_product_list_clamps_per_page(client):
+    for per_page in (0, -5):
+        response = client.get(f'/products?per_page={per_page}')
+        assert response.status_code == 200
+        assert b'href="/products/1"' in response.data
+        assert b'href="/products/2"' not in response.data
@@ -0,0 +1,105 @@
+def test_redis_memoize_key_ignores_call_style(app):
+    from utils.redis_cache import redis_client, redis_memoize
+    calls = []
+    
+    @redis_memoize('memo_test')
+    def add(param1, param2=0):
+        calls.append((param1, param2))
+        return param1 + param2
+    
+    with app.app_context():
+        redis_client.flushall()
+        results = [add(1, 2), add(1, param2=2), add(param1=1, param2=2), add(param2=2, param1=1)]
+    
+    assert results == [3, 3, 3, 3]
+    assert calls == [(1, 2)]
+
+def test_redis_memoize_accepts_non_json_arguments(app):
+    from utils.redis_cache import redis_client, redis_memoize
+    
+    @redis_memoize('memo_test')
+    def describe(value):
+        return type(value).__name__
+    
+    with app.app_context():
+        redis_client.flushall()
+        assert describe(object()) == 'object'
+
+def test_redis_memoize_key_ignores_dict_order(app):
+    from utils.redis_cache import redis_client, redis_memoize
+    calls = []
+    
+    @redis_memoize('memo_test')
+    def total(values):
+        calls.append(values)
+        return sum(values.values())
+    
+    with app.app_context():
+        redis_client.flushall()
+        assert total({'x': 1, 'y': 2}) == 3
+        assert total({'y': 2, 'x': 1}) == 3
+    
+    assert len(calls) == 1
+
+def test_redis_memoize_accepts_non_string_dict_keys(app):
+    from utils.redis_cache import redis_client, redis_memoize
+    
+    @redis_memoize('memo_test')
+    def lookup(table, key):
+        return table[key]
+    
+    with app.app_context():
+        redis_client.flushall()
+        assert lookup({1: 2}, 1) == 2
+        assert lookup({1: 2}, 1) == 2
+
+def test_trim_lru_keeps_most_recent_entries(app):
+    from utils.redis_cache import redis_client
+    from utils.tasks import trim_lru
+    
+    redis_client.flushall()
+    for i in range(5):
+        redis_client.set(f'memo_test:{i}', i)
+        redis_client.zadd('memo_test:lru', {f'memo_test:{i}': i})
+    
+    trim_lru('memo_test', max_entries=2)
+    
+    assert redis_client.zrange('memo_test:lru', 0, -1) == [b'memo_test:3', b'memo_test:4']
+    assert sorted(redis_client.keys('memo_test:?')) == [b'memo_test:3', b'memo_test:4']
+
+def test_redis_cache_max_age_is_remaining_ttl(client):
+    from utils.redis_cache import redis_client
+    
+    assert client.get('/api/data').headers['Cache-Control'] == 'public, max-age=30'
+    
+    redis_client.expire('api_data', 12)
+    assert client.get('/api/data').headers['Cache-Control'] == 'public, max-age=12'
+
+def test_redis_cache_if_none_match_uses_weak_comparison(client):
+    etag = client.get('/api/data').headers['ETag']
+    
+    for header in (etag, 'W/' + etag, f'"other", {etag}', '*'):
+        assert client.get('/api/data', headers={'If-None-Match': header}).status_code == 304
+    assert client.get('/api/data', headers={'If-None-Match': '"other"'}).status_code == 200
+
+def test_redis_cache_negotiates_gzip(client):
+    import gzip
+    import orjson
+    
+    compressed = client.get('/api/data', headers={'Accept-Encoding': 'gzip'})
+    identity = client.get('/api/data')
+    
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in identity.headers
+    assert orjson.loads(gzip.decompress(compressed.data)) == orjson.loads(identity.data)
+    assert compressed.headers['ETag'] != identity.headers['ETag']
+    
+    # Each ETag only validates the encoding it was issued for
+    for etag, accept, status in (
+        (compressed.headers['ETag'], 'gzip', 304),
+        (compressed.headers['ETag'], 'identity', 200),
+        (identity.headers['ETag'], 'identity', 304),
+        (identity.headers['ETag'], 'gzip', 200),
+    ):
+        response = client.get('/api/data', headers={'If-None-Match': etag, 'Accept-Encoding': accept})
+        assert response.status_code == status